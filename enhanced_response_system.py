@@ -81,6 +81,59 @@ class StreamingAnimator:
                 # Message too frequent or other error, just continue
                 continue
 
+class LiveMessageEditor:
+    """Edits a placeholder message in place while a reply is streamed from the model."""
+    
+    def __init__(self, message, min_interval: float = 1.0, max_length: int = 4096):
+        self.message = message
+        self.min_interval = min_interval  # Telegram allows ~1 edit/sec per message
+        self.max_length = max_length
+        self.has_streamed = False
+        self._start_time = datetime.now()
+        self._last_edit = 0.0
+        self._last_text = ""
+    
+    async def update(self, text: str):
+        """Show the partial reply, throttled to one edit per `min_interval`."""
+        now = asyncio.get_running_loop().time()
+        if now - self._last_edit < self.min_interval:
+            return
+        preview = text[:self.max_length]
+        if not preview.strip() or preview == self._last_text:
+            return
+        self._last_edit = now
+        try:
+            # Plain text: partial Markdown is usually unbalanced
+            await self.message.edit_text(preview)
+            self._last_text = preview
+            self.has_streamed = True
+        except Exception:
+            # Rate limited or transient error - the next update catches up
+            pass
+    
+    async def finalize(self, text: str, provider: str = "AI") -> bool:
+        """Replace the preview with the final reply. Returns False if the caller must send it."""
+        if not self.has_streamed:
+            return False
+        # Same sections + metadata footer as ProfessionalResponseBuilder gives non-streamed replies
+        formatter = StreamingResponseFormatter()
+        duration = (datetime.now() - self._start_time).total_seconds()
+        text = formatter.add_metadata(formatter.format_with_sections(text), provider, duration)
+        if len(text) > self.max_length:
+            return False
+        try:
+            await self.message.edit_text(text, parse_mode='Markdown')
+            return True
+        except Exception as e:
+            if "not modified" in str(e).lower():
+                return True  # Preview already shows the final text
+        try:
+            # Final reply has Markdown Telegram can't parse - show it as plain text
+            await self.message.edit_text(text)
+            return True
+        except Exception as e:
+            return "not modified" in str(e).lower()
+
 class StreamingResponseFormatter:
     """Formats responses with professional markdown styling."""
     
@@ -3,14 +3,28 @@ import asyncio
 import io
 import os
 import json
+import time
+import threading
+import importlib.util
+from collections import OrderedDict
 from datetime import datetime
+from urllib.parse import quote_plus
+from functools import lru_cache
 import re
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass, field, fields
 # --- PIL (Image) is no longer needed ---
 # from PIL import Image
 
 import httpx  # For Google Custom Search & Cerebras API
+try:
+    import orjson  # Optional: 3-10x faster JSON for LLM payloads
+except ImportError:
+    orjson = None
+try:
+    import hyperscan  # Optional: SIMD multi-pattern matching for events queries (x86-64 Linux only)
+except ImportError:
+    hyperscan = None
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, File # File might still be useful for documents
 from telegram.ext import (
     Application,
@@ -21,7 +35,9 @@ from telegram.ext import (
     ContextTypes,
 )
 from telegram.constants import ChatAction
+from telegram.error import RetryAfter, TelegramError
 from enhanced_response_system import (
+    LiveMessageEditor,
     stream_response_to_user
 )
 
@@ -45,6 +61,7 @@ GROQ_KIMI_MODEL = "moonshotai/kimi-k2-instruct-0905"   # Primary: Kimi K2
 GROQ_GPT_120B_MODEL = "openai/gpt-oss-120b"           # Fallback 1: GPT-OSS 120B
 GROQ_GPT_20B_MODEL = "openai/gpt-oss-20b"             # Fallback 2: GPT-OSS 20B
 GROQ_MODEL = GROQ_KIMI_MODEL  # Use Kimi K2 as default
+GROQ_HEDGE_DELAY = 0.8  # Seconds Kimi K2 gets to start streaming before GPT-OSS-120B is also tried (~p80 latency)
 DEFAULT_MODEL = GROQ_MODEL
 
 # --- CEREBRAS CONFIGURATION (Fallback Provider) ---
@@ -64,6 +81,8 @@ AVERAGE_RESPONSE_LENGTH = 1500
 MAX_HISTORY = 10
 RATE_LIMIT_SECONDS = 3
 USER_DATA_FILE = "user_data.json"
+SEARCH_MAX_MATCHES = 500  # /search stops scanning after this many hits
+USER_DATA_FLUSH_INTERVAL = 5.0  # Seconds to batch session changes before writing USER_DATA_FILE
 
 # Internet Search Configuration
 SEARCH_ENABLED = True
@@ -99,6 +118,21 @@ JINA_ENABLED = True
 # Wikipedia - Always enabled (no API key needed)
 WIKIPEDIA_ENABLED = True
 
+# ============ JSON HELPERS ============
+# Use orjson on the request/response hot path when installed, stdlib json otherwise
+
+if orjson is not None:
+    json_loads = orjson.loads
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+else:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
 # ============ INTENT CLASSIFICATION SYSTEM ============
 # Smart intent detection to distinguish conversations from questions
 
@@ -114,6 +148,12 @@ class IntentType:
     GENERAL_TASK = "general_task"   # AI only, no search
 
 
+# Intent groups used for routing (frozensets: one hash probe per check)
+_FAST_INTENTS = frozenset({IntentType.GREETING, IntentType.SMALL_TALK})
+_REALTIME_INTENTS = frozenset({IntentType.TIME_QUERY, IntentType.DATE_QUERY})
+_SEARCH_INTENTS = frozenset({IntentType.REAL_TIME_DATA, IntentType.INFO_QUESTION})
+
+
 # ============ USER PREFERENCES SYSTEM ============
 # Like Claude AI's preferences feature for personalized responses
 
@@ -206,6 +246,13 @@ RESPONSE_STYLE_PRESETS = {
     },
 }
 
+# /style help text - the presets are static, so build it once
+_STYLES_LISTING = "\n".join(
+    f"• **{name}** - {preset['description']}"
+    for name, preset in RESPONSE_STYLE_PRESETS.items()
+)
+_STYLE_NAMES = ", ".join(RESPONSE_STYLE_PRESETS)
+
 
 # ============ EMOTIONAL INTELLIGENCE SYSTEM ============
 # Detect user mood and adapt response tone
@@ -345,6 +392,26 @@ INFO_QUESTION_PATTERNS = [
     r'^(can|could|would|will|is|are|do|does|did|has|have)\s+',
 ]
 
+# Messages that never need search or AI intent classification
+CHITCHAT_PHRASES = frozenset({
+    'hi', 'hello', 'hey', 'thanks', 'thank you', 'ok', 'okay', 'lol', 'bye', 'yes', 'no'
+})
+
+
+def is_chitchat(query: str) -> bool:
+    """Cheap pre-check for one/two-word chitchat like "hi" or "thanks!" (no regex, no AI)."""
+    if '?' in query or len(query.split()) > 2:
+        return False
+    return query.lower().strip(" \t!.,") in CHITCHAT_PHRASES
+
+
+# Words that switch on live search in handle_message (one regex pass instead of per-keyword scans)
+_SEARCH_TRIGGER_RE = re.compile(r'\b(?:latest|current|today|now|recent|news|weather|price)\b', re.IGNORECASE)
+
+# Keywords that send a search to the events agent in get_llama_response (word-bounded, plurals allowed)
+_EVENT_ROUTE_RE = re.compile(r'\b(?:event|meetup|conference|workshop|seminar|webinar)s?\b', re.IGNORECASE)
+
+
 def classify_intent(query: str) -> str:
     """
     Classify user message intent using pattern matching.
@@ -443,34 +510,38 @@ async def classify_intent_with_ai(query: str) -> str:
         }
         
         async with httpx.AsyncClient(timeout=3.0) as client:
-            response = await client.post(CEREBRAS_URL, headers=headers, json=payload)
+            response = await client.post(CEREBRAS_URL, headers=headers, content=json_dumps(payload))
             
             if response.status_code != 200:
                 logger.warning(f"AI intent classification failed: {response.status_code}, using regex fallback")
                 return classify_intent(query)
             
-            data = response.json()
+            data = json_loads(response.content)
             ai_response = data['choices'][0]['message']['content'].strip().upper()
             
             # Map AI response to intent types
             if "GREETING" in ai_response:
                 logger.info(f"AI classified as GREETING: {query[:30]}...")
-                return IntentType.GREETING
+                intent = IntentType.GREETING
             elif "SMALL" in ai_response or "TALK" in ai_response:
                 logger.info(f"AI classified as SMALL_TALK: {query[:30]}...")
-                return IntentType.SMALL_TALK
+                intent = IntentType.SMALL_TALK
             elif "KNOWLEDGE" in ai_response or "GENERAL" in ai_response:
                 # Knowledge/General task - AI can handle without search
                 logger.info(f"AI classified as GENERAL_TASK (no search): {query[:30]}...")
-                return IntentType.GENERAL_TASK
+                intent = IntentType.GENERAL_TASK
             elif "REALTIME" in ai_response or "REAL" in ai_response or "TIME" in ai_response or "LIVE" in ai_response:
                 # Real-time data needed - trigger search
                 logger.info(f"AI classified as REAL_TIME_DATA (search needed): {query[:30]}...")
-                return IntentType.REAL_TIME_DATA
+                intent = IntentType.REAL_TIME_DATA
             else:
                 # Default to GENERAL_TASK (no search) to avoid unnecessary searches
                 logger.info(f"AI returned '{ai_response}', defaulting to GENERAL_TASK")
-                return IntentType.GENERAL_TASK
+                intent = IntentType.GENERAL_TASK
+            
+            # Only real AI answers are cached - regex fallbacks below are not
+            _remember_intent(query, intent)
+            return intent
                 
     except asyncio.TimeoutError:
         logger.warning(f"AI intent classification timed out, using regex fallback")
@@ -480,6 +551,26 @@ async def classify_intent_with_ai(query: str) -> str:
         return classify_intent(query)
 
 
+# LRU of recent AI classifications keyed by the message's first 64 chars (lowercased)
+INTENT_CACHE_SIZE = 4096
+_INTENT_CACHE: "OrderedDict[str, str]" = OrderedDict()
+
+def _remember_intent(query: str, intent: str):
+    """Cache an intent returned by the AI classifier (called by classify_intent_with_ai on success)."""
+    _INTENT_CACHE[query[:64].lower()] = intent
+    if len(_INTENT_CACHE) > INTENT_CACHE_SIZE:
+        _INTENT_CACHE.popitem(last=False)
+
+async def classify_intent_cached(query: str) -> str:
+    """classify_intent_with_ai, skipping the network call for recently seen messages."""
+    key = query[:64].lower()
+    intent = _INTENT_CACHE.get(key)
+    if intent is not None:
+        _INTENT_CACHE.move_to_end(key)
+        return intent
+    return await classify_intent_with_ai(query)
+
+
 # ============ QUERY COMPLEXITY DETECTOR ============
 # Based on how ChatGPT/Claude detect query complexity for response length
 def get_query_complexity(query: str, intent: str) -> str:
@@ -494,7 +585,7 @@ def get_query_complexity(query: str, intent: str) -> str:
     word_count = len(query.split())
     
     # MINIMAL: Simple greetings and acknowledgments (1-2 sentences max)
-    if intent in [IntentType.GREETING, IntentType.SMALL_TALK]:
+    if intent in _FAST_INTENTS:
         return 'minimal'
     
     # MINIMAL: Very short queries without question words (just chatting)
@@ -916,6 +1007,19 @@ def get_system_prompt_with_timestamp() -> str:
 # Default for backward compatibility
 DEFAULT_SYSTEM_INSTRUCTION = BASE_SYSTEM_INSTRUCTION
 
+
+@lru_cache(maxsize=2)
+def _system_message(epoch_second: int) -> dict:
+    """Timestamped system message, built once per second and shared by requests in that second."""
+    return {"role": "system", "content": get_system_prompt_with_timestamp()}
+
+
+@lru_cache(maxsize=2)
+def _timestamp_strings(epoch_second: int) -> tuple:
+    """Format (display timestamp, search timestamp) once per wall-clock second."""
+    dt = datetime.fromtimestamp(epoch_second)
+    return (dt.strftime("%A, %B %d, %Y at %I:%M %p"), dt.strftime("%Y-%m-%d %H:%M:%S"))
+
 # ============ SETUP LOGGING ============
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -936,11 +1040,16 @@ generation_config = {
     "top_k": TOP_K,
 }
 
+# generation_config is fixed after startup - snapshot the values shown to users
+_DISPLAY_TEMP = generation_config.get("temperature", "N/A")
+_DISPLAY_MAX_TOKENS = generation_config.get("max_tokens", "N/A")
+_DISPLAY_TOP_P = generation_config.get("top_p", "N/A")
+
 # ============ USER DATA STORAGE (NOW WITH PERSISTENCE) ============
 user_sessions: Dict[int, Dict] = {}
 
-def save_user_data():
-    """Saves non-object session data to JSON."""
+def _serialize_user_data() -> Dict[int, Dict]:
+    """Snapshot the non-object session data that gets persisted."""
     serializable_data = {}
     for user_id, session in user_sessions.items():
         prompt_to_save = session.get('system_prompt')
@@ -956,20 +1065,80 @@ def save_user_data():
             'system_prompt': prompt_to_save,
             'model_name': session.get('model_name', DEFAULT_MODEL)
         }
+    return serializable_data
+
+# Saves run both on the event loop (/system, shutdown) and in a worker thread (periodic flush)
+_user_data_write_lock = threading.Lock()
+
+def _write_user_data(serializable_data: Dict[int, Dict]):
+    # Write a temp file and swap it in, so a crash or overlapping save never leaves a truncated file
+    tmp_file = f"{USER_DATA_FILE}.tmp"
     try:
-        with open(USER_DATA_FILE, 'w') as f:
-            json.dump(serializable_data, f, indent=4)
+        with _user_data_write_lock:
+            with open(tmp_file, 'w') as f:
+                json.dump(serializable_data, f, indent=4)
+            os.replace(tmp_file, USER_DATA_FILE)
     except Exception as e:
         logger.error(f"Failed to save user data: {e}")
 
+def save_user_data():
+    """Saves non-object session data to JSON."""
+    _write_user_data(_serialize_user_data())
+
+# Debounced saving: handlers mark the data dirty and a background task writes it
+# at most once per USER_DATA_FLUSH_INTERVAL (created in post_init, flushed on shutdown)
+_user_data_dirty: Optional[asyncio.Event] = None
+_user_data_flush_task: Optional[asyncio.Task] = None
+_user_data_write: Optional[asyncio.Future] = None  # In-flight background write, awaited on shutdown
+
+def mark_user_data_dirty():
+    """Schedule a save of user data. Saves immediately if the flush task isn't running."""
+    if _user_data_dirty is None:
+        save_user_data()
+    else:
+        _user_data_dirty.set()
+
+async def _periodic_flush():
+    global _user_data_write
+    while True:
+        await _user_data_dirty.wait()
+        await asyncio.sleep(USER_DATA_FLUSH_INTERVAL)
+        _user_data_dirty.clear()
+        # Snapshot on the event loop so handlers can't mutate sessions mid-serialization
+        data = _serialize_user_data()
+        _user_data_write = asyncio.ensure_future(asyncio.to_thread(_write_user_data, data))
+        # Shielded: cancelling the flusher must not abandon a write halfway
+        await asyncio.shield(_user_data_write)
+
+async def start_user_data_flusher(application: Application):
+    global _user_data_dirty, _user_data_flush_task
+    _user_data_dirty = asyncio.Event()
+    _user_data_flush_task = asyncio.create_task(_periodic_flush())
+
+async def stop_user_data_flusher(application: Application):
+    global _user_data_dirty, _user_data_flush_task, _user_data_write
+    if _user_data_flush_task:
+        _user_data_flush_task.cancel()
+        try:
+            await _user_data_flush_task
+        except asyncio.CancelledError:
+            pass
+    # Let a write already running in the worker thread finish before the final save
+    if _user_data_write is not None and not _user_data_write.done():
+        await _user_data_write
+    _user_data_dirty = None
+    _user_data_flush_task = None
+    _user_data_write = None
+    save_user_data()  # Final flush of anything still pending
+
 def load_user_data() -> Dict[int, Dict]:
     """Loads session data from JSON at startup."""
     if not os.path.exists(USER_DATA_FILE):
         logger.warning(f"{USER_DATA_FILE} not found. Starting with empty data.")
         return {}
     try:
-        with open(USER_DATA_FILE, 'r') as f:
-            data = json.load(f)
+        with open(USER_DATA_FILE, 'rb') as f:
+            data = json_loads(f.read())
             loaded_sessions = {}
             for k, v in data.items():
                 user_id = int(k)
@@ -998,16 +1167,22 @@ def get_user_session(user_id: int) -> Dict:
             'username': None,
             'language': 'en',
             'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'created_at_ts': time.time(),  # Epoch seconds, for /stats duration
             'system_prompt': DEFAULT_SYSTEM_INSTRUCTION,
             'model_name': DEFAULT_MODEL,
             'conversation_history': [],  # Store messages as list
+            'conversation_history_lower': [],  # Lowercased contents, parallel to conversation_history (for /search)
             'preferences': UserPreferences.get_defaults(),  # User preferences for personalization
         }
-        save_user_data()
+        mark_user_data_dirty()
 
     # Initialize conversation history if not present
     if 'conversation_history' not in user_sessions[user_id]:
         user_sessions[user_id]['conversation_history'] = []
+    if 'conversation_history_lower' not in user_sessions[user_id]:
+        user_sessions[user_id]['conversation_history_lower'] = [
+            str(m.get('content', '')).lower() for m in user_sessions[user_id]['conversation_history']
+        ]
     
     # Initialize preferences if not present (for existing users)
     if 'preferences' not in user_sessions[user_id]:
@@ -1039,7 +1214,8 @@ def clear_user_history(user_id: int):
         logger.info(f"Clearing history for user {user_id}")
         session = user_sessions[user_id]
         session['conversation_history'] = []
-        save_user_data()
+        session['conversation_history_lower'] = []
+        mark_user_data_dirty()
         logger.info(f"History cleared for user {user_id}")
         return True
     else:
@@ -1047,6 +1223,12 @@ def clear_user_history(user_id: int):
         return False
 
 
+def append_to_history(session: Dict, role: str, content: str):
+    """Append a message to the session history, keeping the lowercase search copy in step."""
+    session['conversation_history'].append({"role": role, "content": content})
+    session['conversation_history_lower'].append(content.lower())
+
+
 # ============ AI INTEGRATION ============
 
 
@@ -1171,6 +1353,54 @@ async def send_split_message(update: Update, context: ContextTypes.DEFAULT_TYPE,
             await update.message.reply_text("❌ An error occurred trying to send the (very long) response.")
 
 
+def paginate_parts(parts: List[str], limit: int = MAX_MESSAGE_LENGTH):
+    """Group text pieces into pages of at most `limit` chars, tracking a running length
+    instead of joining everything and splitting afterwards."""
+    page = []
+    running_len = 0
+    for piece in parts:
+        if page and running_len + len(piece) > limit:
+            yield ''.join(page)
+            page = []
+            running_len = 0
+        page.append(piece)
+        running_len += len(piece)
+    if page:
+        yield ''.join(page)
+
+
+async def send_paginated(update: Update, context: ContextTypes.DEFAULT_TYPE, parts: List[str]):
+    """Send pieces as one or more Markdown messages, each under MAX_MESSAGE_LENGTH."""
+    for i, page in enumerate(paginate_parts(parts)):
+        if i > 0:
+            await asyncio.sleep(0.5)
+        if len(page) > MAX_MESSAGE_LENGTH:
+            # A single piece longer than the limit still needs the line-based splitter
+            await send_split_message(update, context, page)
+        else:
+            await update.message.reply_text(page, parse_mode='Markdown')
+
+
+async def _safe_reply(message, text: str, **kwargs):
+    """reply_text that waits out a Telegram flood limit (429) and retries once."""
+    try:
+        return await message.reply_text(text, **kwargs)
+    except RetryAfter as e:
+        retry_after = e.retry_after
+        delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+        logger.warning(f"Rate limited in chat {message.chat_id}, retrying in {delay:.0f}s")
+        await asyncio.sleep(delay)
+        return await message.reply_text(text, **kwargs)
+
+
+async def delete_message_quietly(message):
+    """Delete a message, ignoring Telegram errors (already deleted, too old, ...)."""
+    try:
+        await message.delete()
+    except TelegramError:
+        pass
+
+
 # ============ INTERNET SEARCH FUNCTIONALITY ============
 
 def should_search(query: str, intent: str = None) -> bool:
@@ -1198,7 +1428,7 @@ def should_search(query: str, intent: str = None) -> bool:
     # This ensures real-time data for any factual question
     
     # ONLY skip search for these simple intents
-    if intent in [IntentType.GREETING, IntentType.SMALL_TALK]:
+    if intent in _FAST_INTENTS:
         logger.info(f"Search skipped (greeting/small_talk): {query[:30]}...")
         return False
     
@@ -1346,12 +1576,12 @@ async def search_internet(query: str, max_results: int = MAX_SEARCH_RESULTS) ->
             
             # Check for errors
             if response.status_code != 200:
-                error_data = response.json() if response.content else {}
+                error_data = json_loads(response.content) if response.content else {}
                 error_msg = error_data.get('error', {}).get('message', f'HTTP {response.status_code}')
                 logger.error(f"Google Search API error {response.status_code}: {error_msg}")
                 return None
             
-            data = response.json()
+            data = json_loads(response.content)
         
         # Format search results
         if 'items' not in data or not data['items']:
@@ -1502,7 +1732,7 @@ async def search_brave(query: str, max_results: int = 5) -> Optional[str]:
                 logger.warning(f"Brave Search: HTTP {response.status_code}")
                 return None
             
-            data = response.json()
+            data = json_loads(response.content)
         
         # Extract web results
         web_results = data.get('web', {}).get('results', [])
@@ -1564,7 +1794,7 @@ async def search_jina(query: str, max_results: int = 5) -> Optional[str]:
             
             # Parse response
             try:
-                data = response.json()
+                data = json_loads(response.content)
                 
                 # Extract search results
                 results = data.get('data', [])
@@ -1660,7 +1890,7 @@ async def search_wikipedia(query: str, max_results: int = 3) -> Optional[str]:
             if search_response.status_code != 200:
                 return None
             
-            search_data = search_response.json()
+            search_data = json_loads(search_response.content)
             search_results = search_data.get("query", {}).get("search", [])
             
             if not search_results:
@@ -1686,7 +1916,7 @@ async def search_wikipedia(query: str, max_results: int = 3) -> Optional[str]:
             if extract_response.status_code != 200:
                 return None
             
-            extract_data = extract_response.json()
+            extract_data = json_loads(extract_response.content)
             pages = extract_data.get("query", {}).get("pages", {})
             
             # Format results
@@ -1740,7 +1970,7 @@ async def search_duckduckgo_instant(query: str) -> Optional[str]:
                 logger.warning(f"DDG Instant: HTTP {response.status_code}")
                 return None
             
-            data = response.json()
+            data = json_loads(response.content)
         
         # Extract useful information
         results = []
@@ -1817,7 +2047,7 @@ async def get_weather_openmeteo(location: str) -> Optional[str]:
                 logger.warning(f"Open-Meteo geocoding failed: {geo_response.status_code}")
                 return None
             
-            geo_data = geo_response.json()
+            geo_data = json_loads(geo_response.content)
             results = geo_data.get('results', [])
             
             if not results:
@@ -1846,7 +2076,7 @@ async def get_weather_openmeteo(location: str) -> Optional[str]:
                 logger.warning(f"Open-Meteo weather failed: {weather_response.status_code}")
                 return None
             
-            weather_data = weather_response.json()
+            weather_data = json_loads(weather_response.content)
             current = weather_data.get('current', {})
             
             temp = current.get('temperature_2m', 'N/A')
@@ -1939,7 +2169,7 @@ class AdaptiveResponseEngine:
         ])
         
         # Simple greetings = casual response
-        is_greeting = intent in [IntentType.GREETING, IntentType.SMALL_TALK]
+        is_greeting = intent in _FAST_INTENTS
         
         # ========== CASUAL (Greetings/Small Talk) ==========
         if is_greeting:
@@ -2019,7 +2249,7 @@ async def get_accurate_time(timezone: str = "Asia/Kolkata") -> Optional[str]:
             response = await client.get(url, timeout=8.0)
             
             if response.status_code == 200:
-                data = response.json()
+                data = json_loads(response.content)
                 # Format: {"year":2026,"month":1,"day":9,"hour":16,"minute":23,...}
                 hour = data.get('hour', 0)
                 minute = data.get('minute', 0)
@@ -2053,7 +2283,7 @@ async def get_accurate_time(timezone: str = "Asia/Kolkata") -> Optional[str]:
             response = await client.get(url, timeout=8.0)
             
             if response.status_code == 200:
-                data = response.json()
+                data = json_loads(response.content)
                 datetime_str = data.get('datetime', '')
                 if datetime_str:
                     dt_part = datetime_str.split('.')[0]
@@ -2133,7 +2363,9 @@ async def search_tavily(query: str, max_results: int = 5) -> Optional[str]:
         logger.info(f"Tavily: '{query[:30]}...' topic={topic} time_range={time_range} days={days_back}")
         
         async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, timeout=15.0)
+            response = await client.post(
+                url, content=json_dumps(payload), headers={"Content-Type": "application/json"}, timeout=15.0
+            )
             
             if response.status_code == 401:
                 logger.error("Tavily API: Invalid API key")
@@ -2145,7 +2377,7 @@ async def search_tavily(query: str, max_results: int = 5) -> Optional[str]:
                 logger.error(f"Tavily API error: {response.status_code}")
                 return None
             
-            data = response.json()
+            data = json_loads(response.content)
         
         # PRIORITY 1: Use Tavily's AI answer (most accurate, recommended by docs)
         if data.get('answer'):
@@ -2195,6 +2427,8 @@ async def search_tavily(query: str, max_results: int = 5) -> Optional[str]:
 # This means NO OpenAI API key required!
 
 GPT_RESEARCHER_ENABLED = False  # Disabled - was using Groq internally
+# Checked once at import (without importing the heavy package) instead of per request
+GPT_RESEARCHER_AVAILABLE = importlib.util.find_spec("gpt_researcher") is not None
 
 def setup_gpt_researcher_with_groq():
     """Configure GPT Researcher to use Groq (FREE) instead of OpenAI.
@@ -2226,14 +2460,14 @@ async def search_with_gpt_researcher(query: str) -> Optional[str]:
     
     Configured to use GROQ (FREE!) instead of requiring OpenAI.
     """
-    if not GPT_RESEARCHER_ENABLED:
+    if not GPT_RESEARCHER_ENABLED or not GPT_RESEARCHER_AVAILABLE:
         return None
     
     try:
         # Configure to use Groq (FREE) instead of OpenAI
         setup_gpt_researcher_with_groq()
         
-        # Try to import GPT Researcher
+        # Availability was checked at startup; import stays lazy to keep it off the hot path
         from gpt_researcher import GPTResearcher
         
         logger.info(f"GPT Researcher: Starting research for '{query[:50]}...'")
@@ -2255,9 +2489,6 @@ async def search_with_gpt_researcher(query: str) -> Optional[str]:
             logger.warning("GPT Researcher: No research results")
             return None
             
-    except ImportError:
-        logger.warning("GPT Researcher not installed. Run: pip install gpt-researcher")
-        return None
     except Exception as e:
         logger.error(f"GPT Researcher error: {e}")
         return None
@@ -2427,89 +2658,229 @@ def expand_query_for_search(query: str) -> str:
 # ============ AI MODEL SYSTEM ============
 # Primary: Kimi K2 via Groq | Fallback 1: GPT-OSS 120B | Fallback 2: GPT-OSS 20B | Final: Cerebras
 
-async def call_groq_api(messages: list, max_tokens: int, model: str = None, retries: int = 2) -> tuple:
-    """Call Groq API with Kimi K2 primary and GPT-OSS fallbacks.
+async def read_error_snippet(response: httpx.Response, limit: int = 200) -> str:
+    """Read at most `limit` bytes of an error body, then close the response.
     
-    Model Hierarchy:
-    1. Kimi K2 (moonshotai/kimi-k2-instruct-0905) - Primary, your preferred
-    2. GPT-OSS-120B (openai/gpt-oss-120b) - First fallback
-    3. GPT-OSS-20B (openai/gpt-oss-20b) - Second fallback
+    Error pages can be large (HTML, long JSON); we only ever log the first
+    few hundred bytes, so stop reading there and free the connection.
+    """
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    await response.aclose()
+    return b"".join(chunks)[:limit].decode("utf-8", errors="replace")
+
+
+async def collect_streamed_reply(response: httpx.Response,
+                                 on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+    """Accumulate an OpenAI-style SSE stream (`data: {...}` frames) into the full reply.
+    
+    `on_delta` receives the text accumulated so far after every content chunk,
+    so callers can show partial replies while the model is still generating.
+    """
+    parts = []
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        frame = line[5:].strip()
+        if frame == "[DONE]":
+            break
+        try:
+            chunk = json_loads(frame)
+        except ValueError:  # json/orjson decode errors both subclass ValueError
+            continue
+        if chunk.get('error'):
+            raise Exception(f"Stream error: {chunk['error']}")
+        choices = chunk.get('choices')
+        if not choices:
+            continue
+        delta = (choices[0].get('delta') or {}).get('content')
+        if delta:
+            parts.append(delta)
+            if on_delta is not None:
+                await on_delta("".join(parts))
+    return "".join(parts)
+
+
+def exclusive_stream(on_delta: Optional[Callable[[str], Awaitable[None]]]):
+    """Build per-contender delta callbacks where only the first to produce text is forwarded.
     
-    Returns: (response_text, 'groq') or raises exception on failure.
+    Used when several models run concurrently so the user sees one coherent
+    partial reply instead of interleaved output from every contender.
+    """
+    owner = []
+    
+    def bind(name: str) -> Optional[Callable[[str], Awaitable[None]]]:
+        if on_delta is None:
+            return None
+        
+        async def forward(text: str):
+            if not owner:
+                owner.append(name)
+            if owner[0] == name:
+                await on_delta(text)
+        
+        return forward
+    
+    return bind
+
+
+async def call_groq_model(model: str, messages: list, max_tokens: int, retries: int = 2,
+                          on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+    """Call a single Groq model with retry logic.
+    
+    Returns the response text, or raises exception once the model has failed
+    (400/503 give up immediately so the caller can move to another model).
     """
-    # Try all three models in order: Kimi K2 first, then GPT-OSS models
-    models_to_try = [GROQ_KIMI_MODEL, GROQ_GPT_120B_MODEL, GROQ_GPT_20B_MODEL]
+    logger.info(f"🤖 Trying Groq model: {model}")
     
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
     }
     
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": generation_config["temperature"],
+        "max_tokens": max_tokens,
+        "top_p": generation_config["top_p"],
+        "stream": True
+    }
+    
     last_error = None
     
-    for current_model in models_to_try:
-        logger.info(f"🤖 Trying Groq model: {current_model}")
-        
-        payload = {
-            "model": current_model,
-            "messages": messages,
-            "temperature": generation_config["temperature"],
-            "max_tokens": max_tokens,
-            "top_p": generation_config["top_p"],
-            "stream": False
-        }
-        
-        for attempt in range(retries):
-            try:
-                async with httpx.AsyncClient(timeout=45.0) as client:  # Increased timeout for larger models
-                    response = await client.post(GROQ_URL, headers=headers, json=payload)
+    for attempt in range(retries):
+        try:
+            async with httpx.AsyncClient(timeout=45.0) as client:  # Increased timeout for larger models
+                # Stream the body so error pages are only read (and capped) when we log them
+                async with client.stream("POST", GROQ_URL, headers=headers, content=json_dumps(payload)) as response:
                     
                     if response.status_code == 200:
-                        data = response.json()
-                        response_text = data['choices'][0]['message']['content']
-                        logger.info(f"✓ Groq {current_model} responded successfully (attempt {attempt + 1})")
-                        return (response_text, 'groq')
+                        response_text = await collect_streamed_reply(response, on_delta)
+                        logger.info(f"✓ Groq {model} responded successfully (attempt {attempt + 1})")
+                        return response_text
                     elif response.status_code == 429:  # Rate limited
+                        await response.aclose()  # Release the connection before backing off
                         wait_time = 2 ** attempt
                         logger.warning(f"Groq rate limited, waiting {wait_time}s (attempt {attempt + 1})")
                         await asyncio.sleep(wait_time)
                         continue
                     elif response.status_code == 400:
-                        # Model error or bad request - try next model
-                        error_msg = response.text[:200] if response.text else "Bad request"
-                        logger.warning(f"Model {current_model} error: {error_msg}, trying fallback...")
-                        break  # Break inner retry loop, try next model
+                        # Model error or bad request - give up on this model
+                        error_msg = await read_error_snippet(response) or "Bad request"
+                        last_error = f"Model {model} error: {error_msg}"
+                        logger.warning(f"{last_error}, trying fallback...")
+                        break
                     elif response.status_code == 503:
-                        # Service unavailable - try next model
-                        logger.warning(f"Model {current_model} unavailable (503), trying fallback...")
+                        # Service unavailable - give up on this model
+                        await response.aclose()
+                        last_error = f"Model {model} unavailable (503)"
+                        logger.warning(f"{last_error}, trying fallback...")
                         break
                     else:
-                        last_error = f"Groq API Error {response.status_code}: {response.text[:200]}"
+                        error_msg = await read_error_snippet(response)
+                        last_error = f"Groq API Error {response.status_code}: {error_msg}"
                         logger.warning(f"{last_error} (attempt {attempt + 1})")
                         # Don't break - retry this model
-                        
-            except httpx.TimeoutException:
-                last_error = f"Groq timeout with {current_model}"
-                wait_time = 2 ** attempt
-                logger.warning(f"{last_error}, retrying in {wait_time}s (attempt {attempt + 1})")
-                await asyncio.sleep(wait_time)
-            except Exception as e:
-                last_error = str(e)
-                logger.warning(f"Groq error: {last_error} (attempt {attempt + 1})")
-                await asyncio.sleep(1)
+                    
+        except httpx.TimeoutException:
+            last_error = f"Groq timeout with {model}"
+            wait_time = 2 ** attempt
+            logger.warning(f"{last_error}, retrying in {wait_time}s (attempt {attempt + 1})")
+            await asyncio.sleep(wait_time)
+        except Exception as e:
+            last_error = str(e)
+            logger.warning(f"Groq error: {last_error} (attempt {attempt + 1})")
+            await asyncio.sleep(1)
+    
+    raise Exception(last_error or f"Groq {model} failed after all retries")
+
+
+async def call_groq_api(messages: list, max_tokens: int, model: str = None, retries: int = 2,
+                        on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> tuple:
+    """Call Groq API with Kimi K2 primary, a hedged GPT-OSS-120B and a GPT-OSS-20B fallback.
+    
+    Model Hierarchy:
+    1. Kimi K2 (moonshotai/kimi-k2-instruct-0905) - Primary, your preferred
+    2. GPT-OSS-120B (openai/gpt-oss-120b) - Hedge: started only if Kimi K2 has not
+       streamed its first token within GROQ_HEDGE_DELAY seconds; first to finish wins
+    3. GPT-OSS-20B (openai/gpt-oss-20b) - Last fallback if both fail
+    
+    Responses are streamed; `on_delta` gets the partial reply as it grows.
+    
+    Returns: (response_text, 'groq') or raises exception on failure.
+    """
+    stream_to = exclusive_stream(on_delta)
+    primary_streaming = asyncio.Event()
+    forward_primary = stream_to('kimi')
+    
+    async def on_primary_delta(text: str):
+        primary_streaming.set()
+        if forward_primary is not None:
+            await forward_primary(text)
+    
+    primary = asyncio.create_task(
+        call_groq_model(GROQ_KIMI_MODEL, messages, max_tokens, retries, on_delta=on_primary_delta)
+    )
+    first_token = asyncio.create_task(primary_streaming.wait())
+    contenders = {primary}
+    last_error = None
+    
+    try:
+        # Hedge: give Kimi K2 a head start before spending quota on a second model
+        await asyncio.wait({primary, first_token}, timeout=GROQ_HEDGE_DELAY,
+                           return_when=asyncio.FIRST_COMPLETED)
+        hedged = not primary.done() and not primary_streaming.is_set()
+        if hedged:
+            logger.info(f"Kimi K2 silent after {GROQ_HEDGE_DELAY}s, hedging with GPT-OSS-120B...")
+            contenders.add(asyncio.create_task(
+                call_groq_model(GROQ_GPT_120B_MODEL, messages, max_tokens, retries,
+                                on_delta=stream_to('gpt-oss-120b'))
+            ))
         
-        # If we're here, this model failed - log and try next
-        if current_model == GROQ_KIMI_MODEL:
-            logger.info(f"Kimi K2 failed, switching to GPT-OSS-120B fallback...")
-        elif current_model == GROQ_GPT_120B_MODEL:
-            logger.info(f"GPT-OSS-120B failed, switching to GPT-OSS-20B fallback...")
+        pending = set(contenders)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    response_text = task.result()
+                except Exception as e:
+                    last_error = str(e)
+                    continue
+                return (response_text, 'groq')
+    finally:
+        # Cancel the loser (or everything, if we were cancelled ourselves)
+        first_token.cancel()
+        for task in contenders:
+            if not task.done():
+                task.cancel()
+    
+    # Hedge didn't produce an answer - walk the remaining models in order
+    fallbacks = [GROQ_GPT_20B_MODEL] if hedged else [GROQ_GPT_120B_MODEL, GROQ_GPT_20B_MODEL]
+    for fallback_model in fallbacks:
+        logger.info(f"Groq models failed so far, switching to {fallback_model} fallback...")
+        try:
+            # Nothing else is running now, so the fallback may stream straight through
+            response_text = await call_groq_model(fallback_model, messages, max_tokens, retries,
+                                                  on_delta=on_delta)
+            return (response_text, 'groq')
+        except Exception as e:
+            last_error = str(e)
     
     raise Exception(last_error or "Groq failed after all retries with all models")
 
 
-async def call_cerebras_api(messages: list, max_tokens: int, model: str, retries: int = 3) -> tuple:
+async def call_cerebras_api(messages: list, max_tokens: int, model: str, retries: int = 3,
+                            on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> tuple:
     """Call Cerebras API with retry logic and exponential backoff.
     
+    Responses are streamed; `on_delta` gets the partial reply as it grows.
+    
     Returns: (response_text, 'cerebras') or raises exception on failure.
     """
     headers = {
@@ -2523,28 +2894,30 @@ async def call_cerebras_api(messages: list, max_tokens: int, model: str, retries
         "temperature": generation_config["temperature"],
         "max_tokens": max_tokens,
         "top_p": generation_config["top_p"],
-        "stream": False
+        "stream": True
     }
     
     last_error = None
     for attempt in range(retries):
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:  # Reduced timeout per attempt
-                response = await client.post(CEREBRAS_URL, headers=headers, json=payload)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    response_text = data['choices'][0]['message']['content']
-                    logger.info(f"Cerebras responded successfully (attempt {attempt + 1}) ✓")
-                    return (response_text, 'cerebras')
-                elif response.status_code == 429:  # Rate limited
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    logger.warning(f"Cerebras rate limited, waiting {wait_time}s (attempt {attempt + 1})")
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    last_error = f"Cerebras API Error {response.status_code}"
-                    logger.warning(f"{last_error} (attempt {attempt + 1})")
+                async with client.stream("POST", CEREBRAS_URL, headers=headers, content=json_dumps(payload)) as response:
+                    
+                    if response.status_code == 200:
+                        response_text = await collect_streamed_reply(response, on_delta)
+                        logger.info(f"Cerebras responded successfully (attempt {attempt + 1}) ✓")
+                        return (response_text, 'cerebras')
+                    elif response.status_code == 429:  # Rate limited
+                        await response.aclose()  # Release the connection before backing off
+                        wait_time = 2 ** attempt  # Exponential backoff
+                        logger.warning(f"Cerebras rate limited, waiting {wait_time}s (attempt {attempt + 1})")
+                        await asyncio.sleep(wait_time)
+                        continue
+                    else:
+                        # Body is never read here - status code is enough to route the retry
+                        await response.aclose()
+                        last_error = f"Cerebras API Error {response.status_code}"
+                        logger.warning(f"{last_error} (attempt {attempt + 1})")
                     
         except httpx.TimeoutException:
             last_error = "Cerebras timeout"
@@ -2563,12 +2936,17 @@ async def call_cerebras_api(messages: list, max_tokens: int, model: str, retries
 # Previously had call_groq_api() and race_ai_models() functions here
 # Now using Cerebras as single AI provider for simplicity and latest models
 
-async def race_ai_models(messages: list, max_tokens: int) -> tuple:
-    """Execute AI models in parallel (Race) and return first successful result."""
+async def race_ai_models(messages: list, max_tokens: int,
+                         on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> tuple:
+    """Execute AI models in parallel (Race) and return first successful result.
+    
+    Partial replies are forwarded to `on_delta` from whichever model streams first.
+    """
+    stream_to = exclusive_stream(on_delta)
     # Models to race - utilizing both available high-speed models
     tasks = [
-        asyncio.create_task(call_groq_api(messages, max_tokens, GROQ_MODEL)),
-        asyncio.create_task(call_cerebras_api(messages, max_tokens, CEREBRAS_MODEL))
+        asyncio.create_task(call_groq_api(messages, max_tokens, GROQ_MODEL, on_delta=stream_to('groq'))),
+        asyncio.create_task(call_cerebras_api(messages, max_tokens, CEREBRAS_MODEL, on_delta=stream_to('cerebras')))
     ]
     
     try:
@@ -2602,8 +2980,12 @@ async def race_ai_models(messages: list, max_tokens: int) -> tuple:
     raise Exception("All AI models failed to respond.")
 
 
-async def get_llama_response(user_content: any, user_id: int, intent: str = None) -> str:
-    """Get response from Best Available AI (Race Groq/Cerebras) with conversation history."""
+async def get_llama_response(user_content: any, user_id: int, intent: str = None,
+                             on_partial: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+    """Get response from Best Available AI (Race Groq/Cerebras) with conversation history.
+    
+    If `on_partial` is given, it receives the reply text as it streams in.
+    """
     try:
         session = get_user_session(user_id)
         if not session:
@@ -2613,21 +2995,22 @@ async def get_llama_response(user_content: any, user_id: int, intent: str = None
         conversation_history = session.get('conversation_history', [])
         
         # ALWAYS use fresh system prompt with current timestamp (like Perplexity AI)
-        system_prompt = get_system_prompt_with_timestamp()
+        system_message = _system_message(int(time.time()))
         
         # Prune history if too long
         if len(conversation_history) > MAX_HISTORY * 2:
             logger.info(f"Pruning history for user {user_id}. Old length: {len(conversation_history)}")
             conversation_history = conversation_history[-(MAX_HISTORY * 2):]
             session['conversation_history'] = conversation_history
+            session['conversation_history_lower'] = session['conversation_history_lower'][-(MAX_HISTORY * 2):]
 
         # Check if internet search is needed based on intent
         user_query = str(user_content) if not isinstance(user_content, str) else user_content
         search_results = None
         search_sources = []
         
-        # Get current timestamp for response
-        current_timestamp = datetime.now().strftime("%A, %B %d, %Y at %I:%M %p")
+        # Get current timestamps for response (cached per second)
+        current_timestamp, unique_time = _timestamp_strings(int(time.time()))
         
         # Use intent-based search decision
         if should_search(user_query, intent):
@@ -2637,14 +3020,14 @@ async def get_llama_response(user_content: any, user_id: int, intent: str = None
             logger.info(f"Search triggered for user {user_id} (intent={intent}): {expanded_query[:50]}...")
             
             # --- EVENTS SEARCH INTEGRATION ---
-            # Simple inline check for event-related queries (avoids function order issues)
-            event_keywords = ["event", "meetup", "conference", "workshop", "seminar", "webinar"]
-            is_event_query = any(kw in user_query.lower() for kw in event_keywords)
+            # Narrow keyword set on purpose: is_events_query also matches news-style phrasing
+            # ("summit", "happening in ...") that must stay with smart_search
+            is_event_query = _EVENT_ROUTE_RE.search(user_query) is not None
             
             if is_event_query:
                 try:
                     # Specialized Event Search
-                    events_agent = EventsIntelligenceAgent()
+                    events_agent = get_events_agent()
                     event_results = await events_agent.discover_events(user_query)
                     if event_results:
                         formatted_events = events_agent.format_events_for_display(event_results)
@@ -2669,9 +3052,7 @@ async def get_llama_response(user_content: any, user_id: int, intent: str = None
                     logger.info(f"Truncated search context to {max_context_chars} chars")
                 
                 # NATURAL AI RESPONSE PROMPT (not robotic search engine style)
-                # Include unique timestamp to ensure fresh context each time
-                unique_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-                
+                # Include search timestamp (second resolution) to ensure fresh context each time
                 enhanced_query = f"""⚠️ CRITICAL: YOUR TRAINING DATA IS OUTDATED! Use ONLY the search data below.
 
 CURRENT DATE/TIME: {current_timestamp}
@@ -2760,17 +3141,13 @@ The search data above = THE ONLY SOURCE OF TRUTH for this answer."""
 {length_instruction}
 {format_instruction}"""
         
-        # Add length instruction AFTER the user content
-        final_user_content = f"{user_content}{final_length_instruction}"
-
-        # Build messages list for Cerebras API
-        messages = []
-        
-        # Always use fresh system prompt with timestamp
-        messages.append({"role": "system", "content": system_prompt})
-        
-        messages.extend(conversation_history)
-        messages.append({"role": "user", "content": str(final_user_content)})
+        # Build messages list: fresh system prompt, history, then the user content
+        # with the length instruction added AFTER it
+        messages = [
+            system_message,
+            *conversation_history,
+            {"role": "user", "content": f"{user_content}{final_length_instruction}"},
+        ]
 
         # ============ AI MODEL RACE (Groq vs Cerebras) ============
         try:
@@ -2778,7 +3155,8 @@ The search data above = THE ONLY SOURCE OF TRUTH for this answer."""
             
             response_text, provider = await race_ai_models(
                 messages=messages,
-                max_tokens=dynamic_max_tokens
+                max_tokens=dynamic_max_tokens,
+                on_delta=on_partial
             )
             
             logger.info(f"Winner: {provider} for user {user_id}")
@@ -2793,13 +3171,12 @@ The search data above = THE ONLY SOURCE OF TRUTH for this answer."""
             # For search-based queries: Store simplified version without old search data
             # This ensures the AI won't see old search results when same question is asked again
             logger.info(f"Search query - storing simplified history entry for user {user_id}")
-            conversation_history.append({"role": "user", "content": f"[Search query: {user_query}]"})
-            conversation_history.append({"role": "assistant", "content": f"[Answered with real-time search data]"})
+            append_to_history(session, "user", f"[Search query: {user_query}]")
+            append_to_history(session, "assistant", "[Answered with real-time search data]")
         else:
             # For non-search queries: Store full Q&A for context
-            conversation_history.append({"role": "user", "content": str(user_query)})
-            conversation_history.append({"role": "assistant", "content": response_text})
-        session['conversation_history'] = conversation_history
+            append_to_history(session, "user", user_query)
+            append_to_history(session, "assistant", response_text)
         
         # Validate and clean the response to remove unwanted content
         cleaned_response = validate_and_clean_response(response_text, user_query)
@@ -2811,6 +3188,60 @@ The search data above = THE ONLY SOURCE OF TRUTH for this answer."""
         return "❌ Sorry, an unexpected error occurred while processing your request. Please try again!"
 
 
+# ============ STATIC UI ============
+# Keyboards and menu texts never change, so build them once at import time
+
+_MAIN_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Help", callback_data='help'),
+     InlineKeyboardButton("ℹ️ About", callback_data='about')],
+    [InlineKeyboardButton("🔧 Settings", callback_data='settings'),
+     InlineKeyboardButton("📊 Stats", callback_data='stats')]
+])
+
+_SETTINGS_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🗑️ Clear History", callback_data='clear_history')],
+    [InlineKeyboardButton("🤖 Switch Model", callback_data='switch_model')],
+    [InlineKeyboardButton("👤 Set Prompt", callback_data='system_prompt_info')],
+    [InlineKeyboardButton("🔍 Search History", callback_data='search_info')],
+    [InlineKeyboardButton("ℹ️ Model Info", callback_data='model_info')],
+    [InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]
+])
+
+_BACK_TO_MENU_KEYBOARD = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]])
+_BACK_TO_SETTINGS_KEYBOARD = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Settings", callback_data='settings')]])
+
+_MAIN_MENU_TEXT = "🤖 **Main Menu**\n\nChoose an option:"
+_SETTINGS_TEXT = "⚙️ **Settings**\n\nChoose an option:"
+_HELP_BUTTON_TEXT = "Send any message for a text reply!\n\nUse /help for all commands."
+_SYSTEM_PROMPT_INFO_TEXT = (
+    "Use the /system command in chat to view or change my personality.\n\n"
+    "**Example:** `/system You are a pirate`\n"
+    "**To reset:** `/system reset`"
+)
+_SEARCH_INFO_TEXT = (
+    "🔍 **Search Conversation History**\n\n"
+    "Use `/search your term` to search through your conversation history.\n\n"
+    "**Example:** `/search python code`\n\n"
+    "This will find all messages containing your search term."
+)
+
+# /preferences keys -> session preference keys, and the allowed values where restricted
+_PREF_INTERNAL_KEY = {
+    'style': 'response_style',
+    'length': 'response_length',
+    'emojis': 'include_emojis',
+    'level': 'expertise_level',
+    'name': 'name',
+}
+# Ordered for display in error messages; _PREF_VALID_VALUES holds the same values for membership checks
+_PREF_VALUE_OPTIONS = {
+    'style': ('friendly', 'professional', 'casual', 'technical', 'concise'),
+    'length': ('short', 'medium', 'detailed'),
+    'level': ('beginner', 'general', 'expert'),
+}
+_PREF_VALID_VALUES = {key: frozenset(options) for key, options in _PREF_VALUE_OPTIONS.items()}
+
+
 # ============ COMMAND HANDLERS ============
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
@@ -2821,14 +3252,6 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     session['username'] = user.username or user.first_name
 
-    keyboard = [
-        [InlineKeyboardButton("📚 Help", callback_data='help'),
-         InlineKeyboardButton("ℹ️ About", callback_data='about')],
-        [InlineKeyboardButton("🔧 Settings", callback_data='settings'),
-         InlineKeyboardButton("📊 Stats", callback_data='stats')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     model_name = session.get('model_name', DEFAULT_MODEL)
 
     welcome_message = f"""
@@ -2846,7 +3269,7 @@ Just send me any message! 💬
 Use /help to see all commands.
 """
 
-    await update.message.reply_text(welcome_message, reply_markup=reply_markup, parse_mode='Markdown')
+    await update.message.reply_text(welcome_message, reply_markup=_MAIN_MENU_KEYBOARD, parse_mode='Markdown')
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /help command"""
@@ -2894,7 +3317,7 @@ async def style_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # Update preferences
             session['preferences']['response_style'] = preset['response_style']
             session['preferences']['include_emojis'] = preset['include_emojis']
-            save_user_data()
+            mark_user_data_dirty()
             
             await update.message.reply_text(
                 f"✅ **Style changed to: {new_style.capitalize()}**\n\n"
@@ -2903,25 +3326,19 @@ async def style_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 parse_mode='Markdown'
             )
         else:
-            available = ", ".join(RESPONSE_STYLE_PRESETS.keys())
             await update.message.reply_text(
                 f"❌ Unknown style: `{new_style}`\n\n"
-                f"**Available styles:** {available}",
+                f"**Available styles:** {_STYLE_NAMES}",
                 parse_mode='Markdown'
             )
     else:
         # Show current style and available options
         current_style = session['preferences'].get('response_style', 'friendly')
         
-        styles_text = "\n".join([
-            f"• **{name}** - {preset['description']}"
-            for name, preset in RESPONSE_STYLE_PRESETS.items()
-        ])
-        
         await update.message.reply_text(
             f"🎨 **Response Style Settings**\n\n"
             f"**Current style:** {current_style.capitalize()}\n\n"
-            f"**Available styles:**\n{styles_text}\n\n"
+            f"**Available styles:**\n{_STYLES_LISTING}\n\n"
             f"**Usage:** `/style professional`",
             parse_mode='Markdown'
         )
@@ -2931,23 +3348,17 @@ async def preferences_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     """Handle /preferences command - view and manage user preferences."""
     user_id = update.effective_user.id
     session = get_user_session(user_id)
-    preferences = session.get('preferences', UserPreferences.get_defaults())
+    preferences = session['preferences']  # Always present: get_user_session initializes it
     
     # Check for setting a preference
     if context.args and len(context.args) >= 2:
         pref_key = context.args[0].lower()
         pref_value = context.args[1].lower()
         
-        valid_keys = {
-            'style': ('response_style', ['friendly', 'professional', 'casual', 'technical', 'concise']),
-            'length': ('response_length', ['short', 'medium', 'detailed']),
-            'emojis': ('include_emojis', ['on', 'off']),
-            'level': ('expertise_level', ['beginner', 'general', 'expert']),
-            'name': ('name', None),  # Any value allowed
-        }
+        internal_key = _PREF_INTERNAL_KEY.get(pref_key)
         
-        if pref_key in valid_keys:
-            internal_key, valid_values = valid_keys[pref_key]
+        if internal_key:
+            valid_values = _PREF_VALID_VALUES.get(pref_key)
             
             # Special handling for boolean emojis
             if pref_key == 'emojis':
@@ -2958,13 +3369,12 @@ async def preferences_command(update: Update, context: ContextTypes.DEFAULT_TYPE
                 preferences[internal_key] = pref_value
             else:
                 await update.message.reply_text(
-                    f"❌ Invalid value for {pref_key}. Valid options: {', '.join(valid_values)}",
+                    f"❌ Invalid value for {pref_key}. Valid options: {', '.join(_PREF_VALUE_OPTIONS[pref_key])}",
                     parse_mode='Markdown'
                 )
                 return
             
-            session['preferences'] = preferences
-            save_user_data()
+            mark_user_data_dirty()
             
             await update.message.reply_text(
                 f"✅ Preference updated: **{pref_key}** = {pref_value}",
@@ -3006,15 +3416,13 @@ async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 Your custom system prompt and model choice are kept.""",
             parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')
-            ]])
+            reply_markup=_BACK_TO_MENU_KEYBOARD
         )
     else:
         await update.message.reply_text("❌ Error clearing history. Please try again.", parse_mode='Markdown')
 
 
-async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE, _DM=DEFAULT_MODEL, _MH=MAX_HISTORY, _datetime=datetime):
     """Show user statistics"""
     user = update.effective_user
     session = get_user_session(user.id)
@@ -3022,39 +3430,47 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Error fetching your session data.")
         return
 
-    chat_history_len = len(session.get('conversation_history', []))
+    sess_get = session.get
+    _hist = sess_get('conversation_history')
+    chat_history_len = len(_hist) if _hist else 0
 
-    model_name = session.get('model_name', DEFAULT_MODEL)
+    model_name = sess_get('model_name', _DM)
+    created_at = sess_get('created_at')
+    
+    # Sessions loaded from disk only have the string - parse it once and cache the epoch
+    if 'created_at_ts' not in session:
+        session['created_at_ts'] = None
+        if created_at:
+            try:
+                session['created_at_ts'] = _datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").timestamp()
+            except (ValueError, TypeError):
+                pass
     
     # Calculate session duration if possible
     session_duration = "N/A"
-    if session.get('created_at'):
-        try:
-            created = datetime.strptime(session['created_at'], "%Y-%m-%d %H:%M:%S")
-            duration = datetime.now() - created
-            days = duration.days
-            hours = duration.seconds // 3600
-            minutes = (duration.seconds % 3600) // 60
-            if days > 0:
-                session_duration = f"{days}d {hours}h {minutes}m"
-            elif hours > 0:
-                session_duration = f"{hours}h {minutes}m"
-            else:
-                session_duration = f"{minutes}m"
-        except:
-            pass
+    created_at_ts = session['created_at_ts']
+    if created_at_ts is not None:
+        days, rem = divmod(max(0, int(time.time() - created_at_ts)), 86400)
+        hours, rem = divmod(rem, 3600)
+        minutes = rem // 60
+        if days > 0:
+            session_duration = f"{days}d {hours}h {minutes}m"
+        elif hours > 0:
+            session_duration = f"{hours}h {minutes}m"
+        else:
+            session_duration = f"{minutes}m"
 
     stats_text = f"""
 📊 **Your Statistics:**
 
 👤 **User:** {user.first_name} (@{user.username or 'N/A'})
 🆔 **User ID:** {user.id}
-💬 **Messages Sent:** {session.get('message_count', 0)}
-📝 **Chat History:** {chat_history_len} messages (Max {MAX_HISTORY * 2})
+💬 **Messages Sent:** {sess_get('message_count', 0)}
+📝 **Chat History:** {chat_history_len} messages (Max {_MH * 2})
 🤖 **Your Model:** `{model_name}`
-📅 **Session Created:** {session.get('created_at', 'N/A')}
+📅 **Session Created:** {created_at or 'N/A'}
 ⏱️ **Session Duration:** {session_duration}
-⏰ **Last Active:** {session.get('last_message_time_str', 'N/A')}
+⏰ **Last Active:** {sess_get('last_message_time_str', 'N/A')}
 """
 
     await update.message.reply_text(stats_text, parse_mode='Markdown')
@@ -3067,17 +3483,13 @@ async def current_model_command(update: Update, context: ContextTypes.DEFAULT_TY
         return
     model_name = session.get('model_name', DEFAULT_MODEL)
 
-    display_max_tokens = generation_config.get("max_tokens", "N/A")
-    display_temp = generation_config.get("temperature", "N/A")
-    display_top_p = generation_config.get("top_p", "N/A")
-
     model_text = f"""
 🤖 **Current Cerebras/Llama Configuration:**
 
 **Your Model:** `{model_name}`
-**Temperature:** {display_temp}
-**Max Tokens:** {display_max_tokens}
-**Top P:** {display_top_p}
+**Temperature:** {_DISPLAY_TEMP}
+**Max Tokens:** {_DISPLAY_MAX_TOKENS}
+**Top P:** {_DISPLAY_TOP_P}
 
 (Use /model to switch models)
 """
@@ -3108,19 +3520,9 @@ async def model_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show settings menu"""
-    keyboard = [
-        [InlineKeyboardButton("🗑️ Clear History", callback_data='clear_history')],
-        [InlineKeyboardButton("🤖 Switch Model", callback_data='switch_model')],
-        [InlineKeyboardButton("👤 Set Prompt", callback_data='system_prompt_info')],
-        [InlineKeyboardButton("🔍 Search History", callback_data='search_info')],
-        [InlineKeyboardButton("ℹ️ Model Info", callback_data='model_info')],
-        [InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await update.message.reply_text(
-        "⚙️ **Settings**\n\nChoose an option:",
-        reply_markup=reply_markup,
+        _SETTINGS_TEXT,
+        reply_markup=_SETTINGS_KEYBOARD,
         parse_mode='Markdown'
     )
 
@@ -3176,23 +3578,59 @@ async def system_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if new_prompt_text.lower() == 'reset':
         new_prompt = DEFAULT_SYSTEM_INSTRUCTION
-        await update.message.reply_text("✅ System prompt reset to default.")
+        parts = ["✅ System prompt reset to default."]
     elif not new_prompt_text.strip():
          await update.message.reply_text("⚠️ Please provide a prompt text after /system or use `/system reset`.")
          return
     else:
         new_prompt = new_prompt_text
-        await update.message.reply_text(f"✅ New system prompt set!")
+        parts = ["✅ New system prompt set!"]
 
+    # One reply for the whole change instead of one per step
     session['system_prompt'] = new_prompt
     if clear_user_history(user_id):
-         await update.message.reply_text("Chat history cleared to apply the new prompt.")
+         parts.append("Chat history cleared to apply the new prompt.")
          save_user_data()
     else:
-         await update.message.reply_text("⚠️ Error clearing history after setting prompt. Please try /clear manually.")
+         parts.append("⚠️ Error clearing history after setting prompt. Please try /clear manually.")
+    await update.message.reply_text("\n".join(parts))
+
+
+# /history text extractors - the message shape is probed once per type, not per message
+def _extract_from_parts(message) -> str:
+    return ''.join(getattr(part, 'text', '') for part in message.parts or ())
+
+def _extract_from_content(message) -> str:
+    return ''.join(getattr(part, 'text', '') for part in getattr(message.content, 'parts', None) or ())
 
+def _extract_from_text(message) -> str:
+    return message.text
 
-async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def _extract_nothing(message) -> str:
+    return ""
+
+_HISTORY_EXTRACTORS: Dict[type, Callable[[object], str]] = {}
+
+def get_history_extractor(message) -> Callable[[object], str]:
+    """Return the text extractor for this message's type, probing its shape on first sight.
+    
+    Chosen by which attributes exist, never by their values, so the cached choice
+    holds for every message of the type (an empty `parts` just yields "")."""
+    extractor = _HISTORY_EXTRACTORS.get(type(message))
+    if extractor is None:
+        if hasattr(message, 'parts'):
+            extractor = _extract_from_parts
+        elif hasattr(message, 'content'):
+            extractor = _extract_from_content
+        elif hasattr(message, 'text'):
+            extractor = _extract_from_text
+        else:
+            extractor = _extract_nothing
+        _HISTORY_EXTRACTORS[type(message)] = extractor
+    return extractor
+
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE, _logger=logger):
     """View recent conversation history"""
     user_id = update.effective_user.id
     session = get_user_session(user_id)
@@ -3228,43 +3666,32 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("📭 No recent messages to display.")
         return
 
-    history_text = f"📜 **Recent Conversation History** ({len(recent_history)} messages)\n\n"
+    parts = [f"📜 **Recent Conversation History** ({len(recent_history)} messages)\n\n"]
     
     for i, message in enumerate(recent_history):
         try:
-            role = getattr(message, 'role', 'unknown')
-            content = ""
-            
-            if hasattr(message, 'parts') and message.parts:
-                for part in message.parts:
-                    if hasattr(part, 'text'):
-                        content += part.text
-            elif hasattr(message, 'content') and hasattr(message.content, 'parts'):
-                for part in message.content.parts:
-                    if hasattr(part, 'text'):
-                        content += part.text
-            elif hasattr(message, 'text'):
-                content = message.text
+            try:
+                role = message.role
+            except AttributeError:
+                role = 'unknown'
+            
+            content = get_history_extractor(message)(message)
             
             # Truncate long messages
             if len(content) > 300:
                 content = content[:300] + "..."
             
             role_emoji = "👤" if role == 'user' else "🤖"
-            history_text += f"{role_emoji} **{role.upper()}:**\n`{content}`\n\n"
+            parts.append(f"{role_emoji} **{role.upper()}:**\n`{content}`\n\n")
         except Exception as e:
-            logger.warning(f"Error processing message in history for user {user_id}: {e}")
+            _logger.warning(f"Error processing message in history for user {user_id}: {e}")
             continue
 
-    history_text += f"\n_Use `/history N` to see more messages (max 20)_"
-    
-    if len(history_text) > MAX_MESSAGE_LENGTH:
-        await send_split_message(update, context, history_text)
-    else:
-        await update.message.reply_text(history_text, parse_mode='Markdown')
+    parts.append("\n_Use `/history N` to see more messages (max 20)_")
+    await send_paginated(update, context, parts)
 
 
-async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE, _logger=logger):
     """Search through conversation history"""
     user_id = update.effective_user.id
     session = get_user_session(user_id)
@@ -3287,46 +3714,38 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Please provide a search term. Example: `/search python`", parse_mode='Markdown')
         return
 
-    conversation_history = session.get('conversation_history', [])
+    conversation_history = session.get('conversation_history')
     if not conversation_history:
         await update.message.reply_text("📭 No conversation history found. Start chatting to build history!")
         return
 
-    # Search through history
-    matches = []
+    # Search through history using the precomputed lowercase copies
+    history_lower = session.get('conversation_history_lower')
+    if history_lower is None or len(history_lower) != len(conversation_history):
+        history_lower = [str(m.get('content', '')).lower() for m in conversation_history]
+        session['conversation_history_lower'] = history_lower
+
+    # Pass 1: find matching indices only (capped), no display strings yet
+    match_indices = []
     history = conversation_history
+    more_matches = False
     
-    for i, message in enumerate(history):
+    for i, (message, content_lower) in enumerate(zip(history, history_lower)):
         try:
-            # Skip system messages
-            if message.get('role') == 'system':
-                continue
-                
-            # Get message content
-            content = message.get('content', '')
-            content_lower = content.lower()
-            
-            # Check if search query matches (case-insensitive substring search)
-            if search_query in content_lower:
-                role = message.get('role', 'unknown')
-                # Truncate long messages for display
-                display_content = content[:200] + "..." if len(content) > 200 else content
-                # Escape backticks in content to prevent markdown issues
-                display_content = display_content.replace('`', "'")
-                matches.append({
-                    'index': i,
-                    'role': role,
-                    'content': display_content,
-                    'full_content': content
-                })
+            # Case-insensitive substring match, skipping system messages
+            if search_query in content_lower and message.get('role') != 'system':
+                if len(match_indices) >= SEARCH_MAX_MATCHES:
+                    more_matches = True
+                    break
+                match_indices.append(i)
         except Exception as e:
-            logger.warning(f"Error processing message in search for user {user_id}: {e}")
+            _logger.warning(f"Error processing message in search for user {user_id}: {e}")
             continue
 
     # Escape search query for markdown display
     safe_query = search_query.replace('`', "'").replace('*', '').replace('_', ' ')
     
-    if not matches:
+    if not match_indices:
         await update.message.reply_text(
             f"🔍 **No matches found** for: `{safe_query}`\n\n"
             "Try different keywords or check your conversation history with /stats",
@@ -3334,30 +3753,41 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
+    # Pass 2: build display entries only for the matches we show
+    # (limit to first 10 matches to avoid message length issues)
+    display_matches = []
+    for i in match_indices[:10]:
+        message = history[i]
+        content = message.get('content', '')
+        # Truncate long messages for display
+        display_content = content[:200] + "..." if len(content) > 200 else content
+        # Escape backticks in content to prevent markdown issues
+        display_content = display_content.replace('`', "'")
+        display_matches.append({
+            'index': i,
+            'role': message.get('role', 'unknown'),
+            'content': display_content,
+        })
+
+    match_count = f"more than {SEARCH_MAX_MATCHES}" if more_matches else str(len(match_indices))
+
     # Format results
-    results_text = f"🔍 **Found {len(matches)} match(es)** for: `{safe_query}`\n\n"
-    
-    # Limit to first 10 matches to avoid message length issues
-    display_matches = matches[:10]
+    parts = [f"🔍 **Found {match_count} match(es)** for: `{safe_query}`\n\n"]
     
     for idx, match in enumerate(display_matches, 1):
         role_emoji = "👤" if match['role'] == 'user' else "🤖"
-        results_text += f"{idx}. {role_emoji} **{match['role'].upper()}:**\n"
-        results_text += f"   `{match['content']}`\n\n"
+        parts.append(f"{idx}. {role_emoji} **{match['role'].upper()}:**\n   `{match['content']}`\n\n")
     
-    if len(matches) > 10:
-        results_text += f"\n_Showing first 10 of {len(matches)} matches. Refine your search for more specific results._"
+    if len(match_indices) > 10:
+        parts.append(f"\n_Showing first 10 of {match_count} matches. Refine your search for more specific results._")
     
-    # Split if too long
-    if len(results_text) > MAX_MESSAGE_LENGTH:
-        await send_split_message(update, context, results_text)
-    else:
-        await update.message.reply_text(results_text, parse_mode='Markdown')
+    # Pages are flushed under the message limit as they fill
+    await send_paginated(update, context, parts)
 
 
 # ============ MESSAGE HANDLERS ============
 
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE, _MML=MAX_MESSAGE_LENGTH, _logger=logger, _datetime=datetime):
     """
     Handle regular text messages with enhanced features:
     - Concurrent processing (no blocking other users)
@@ -3367,7 +3797,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     - Professional ChatGPT/Gemini-style formatting
     """
     if not update.message or not update.message.text:
-        logger.warning("Received update without message.")
+        _logger.warning("Received update without message.")
         return
 
     user = update.effective_user
@@ -3385,18 +3815,21 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Session error. Please try /start")
         return
 
-    current_time = datetime.now()
+    current_time = _datetime.now()
     session['last_message_time_dt'] = current_time
-    session['last_message_time_str'] = current_time.strftime("%Y-%m-%d %H:%M:%S")
+    session['last_message_time_str'] = (
+        f"{current_time.year:04d}-{current_time.month:02d}-{current_time.day:02d} "
+        f"{current_time.hour:02d}:{current_time.minute:02d}:{current_time.second:02d}"
+    )
     session['message_count'] = session.get('message_count', 0) + 1
     session['username'] = user.username or user.first_name
 
     thinking_message = await update.message.reply_text("⚡ Processing...")
-    processing_start = datetime.now()
 
     try:
         # ============ DETECT REQUEST TYPE ============
-        conversation_length = len(session.get('conversation_history', []))
+        _hist = session.get('conversation_history')
+        conversation_length = len(_hist) if _hist else 0
         
         # Simple request type detection
         is_question = '?' in user_message
@@ -3413,19 +3846,20 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             request_type = "brief"
             max_tokens = 1000
         
-        logger.info(f"User {user_id} - Request type: {request_type}, tokens: {max_tokens}")
+        _logger.info(f"User {user_id} - Request type: {request_type}, tokens: {max_tokens}")
         
         # ============ INTENT CLASSIFICATION ============
-        quick_intent = classify_intent(user_message)
+        # Chitchat short-circuit: skips the regex passes, the AI classifier and search
+        quick_intent = IntentType.SMALL_TALK if is_chitchat(user_message) else classify_intent(user_message)
         
-        if quick_intent in [IntentType.GREETING, IntentType.SMALL_TALK]:
+        if quick_intent in _FAST_INTENTS:
             intent = quick_intent
         elif quick_intent == IntentType.GENERAL_TASK:
             intent = IntentType.GENERAL_TASK
-        elif quick_intent in [IntentType.TIME_QUERY, IntentType.DATE_QUERY]:
+        elif quick_intent in _REALTIME_INTENTS:
             intent = IntentType.REAL_TIME_DATA
         else:
-            intent = await classify_intent_with_ai(user_message)
+            intent = await classify_intent_cached(user_message)
 
         # ============ DYNAMIC TOKEN ALLOCATION ============
         # Token count is now set above in request type detection
@@ -3435,46 +3869,51 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             response_instruction = "Provide a brief, concise answer."
         else:
             response_instruction = "Provide a clear, helpful response."
-        logger.info(f"Response instruction: {response_instruction[:50]}...")
+        _logger.info(f"Response instruction: {response_instruction[:50]}...")
 
         # ============ SMART SEARCH ============
-        search_keywords = ['latest', 'current', 'today', 'now', 'recent', 'news', 'weather', 'price']
-        search_needed = any(kw in user_message.lower() for kw in search_keywords)
+        search_needed = bool(_SEARCH_TRIGGER_RE.search(user_message))
         
-        if intent in [IntentType.REAL_TIME_DATA, IntentType.INFO_QUESTION]:
+        if intent in _SEARCH_INTENTS:
             search_needed = True
         
         if search_needed:
-            logger.info(f"Search enabled for user {user_id}")
+            _logger.info(f"Search enabled for user {user_id}")
 
         # ============ GET RESPONSE ============
+        # Partial replies are streamed into the "Processing..." message as they arrive
+        live_editor = LiveMessageEditor(thinking_message, max_length=_MML)
         enhanced_content = f"{user_message}\n\n---\n{response_instruction}"
-        response_text = await get_llama_response(enhanced_content, user_id, intent)
+        response_text = await get_llama_response(
+            enhanced_content, user_id, intent, on_partial=live_editor.update
+        )
 
         if response_text:
-            await stream_response_to_user(
-                update, context,
-                response_text,
-                show_animation=True,
-                provider="Cerebras"
-            )
-            
-            try:
-                await thinking_message.delete()
-            except:
-                pass
+            # Replace the streamed preview with the final reply; fall back to the
+            # animated sender if nothing streamed or the reply needs splitting
+            if not await live_editor.finalize(response_text, provider="Cerebras"):
+                # Remove the placeholder while the reply is being sent, not after
+                await asyncio.gather(
+                    stream_response_to_user(
+                        update, context,
+                        response_text,
+                        show_animation=not live_editor.has_streamed,
+                        provider="Cerebras"
+                    ),
+                    delete_message_quietly(thinking_message),
+                )
         else:
             await thinking_message.edit_text("⚠️ Empty response. Try again.")
 
-        save_user_data()
+        mark_user_data_dirty()
 
     except Exception as e:
         import traceback
-        logger.error(f"Error in handle_message {user_id}: {e}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        _logger.error(f"Error in handle_message {user_id}: {e}")
+        _logger.error(f"Traceback: {traceback.format_exc()}")
         try:
             await thinking_message.edit_text("❌ Error. Try /clear")
-        except:
+        except TelegramError:
             await update.message.reply_text("❌ Error. Try /clear")
 
 
@@ -3497,7 +3936,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 # ============ CALLBACK QUERY HANDLERS ============
-async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, _DM=DEFAULT_MODEL, _logger=logger):
     """Handle inline keyboard button presses"""
     query = update.callback_query
     await query.answer()
@@ -3506,74 +3945,57 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     data = query.data
 
     if data == 'menu':
-        keyboard = [
-            [InlineKeyboardButton("📚 Help", callback_data='help'),
-             InlineKeyboardButton("ℹ️ About", callback_data='about')],
-            [InlineKeyboardButton("🔧 Settings", callback_data='settings'),
-             InlineKeyboardButton("📊 Stats", callback_data='stats')]
-        ]
         await query.edit_message_text(
-             "🤖 **Main Menu**\n\nChoose an option:",
-             reply_markup=InlineKeyboardMarkup(keyboard),
+             _MAIN_MENU_TEXT,
+             reply_markup=_MAIN_MENU_KEYBOARD,
              parse_mode='Markdown'
         )
     elif data == 'help':
         # --- UPDATED Help Button Response ---
-        help_text = "Send any message for a text reply!\n\nUse /help for all commands."
-        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]])
-        await query.edit_message_text(help_text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(_HELP_BUTTON_TEXT, parse_mode='Markdown', reply_markup=_BACK_TO_MENU_KEYBOARD)
 
     elif data == 'about':
         # --- UPDATED About Button Response ---
         session = get_user_session(user_id)
         model_name = "N/A"
-        if session: model_name = session.get('model_name', DEFAULT_MODEL)
+        if session: model_name = session.get('model_name', _DM)
         about_text = f"🤖 **Powered by Cerebras/Llama AI**\n\n**Your Model:** `{model_name}`\nI understand text!"
-        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]])
-        await query.edit_message_text(about_text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(about_text, parse_mode='Markdown', reply_markup=_BACK_TO_MENU_KEYBOARD)
 
     elif data == 'stats':
         session = get_user_session(user_id)
         if not session:
-             await query.edit_message_text("❌ Error fetching session.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]]))
+             await query.edit_message_text("❌ Error fetching session.", reply_markup=_BACK_TO_MENU_KEYBOARD)
              return
 
-        history_length = len(session.get('conversation_history', []))
-        model_name = session.get('model_name', DEFAULT_MODEL)
+        _hist = session.get('conversation_history')
+        history_length = len(_hist) if _hist else 0
+        model_name = session.get('model_name', _DM)
         stats_text = f"📊 **Your Stats**\n\n💬 Messages: {session.get('message_count', 0)}\n📝 History: {history_length} msgs\n🤖 Model: `{model_name}`"
-        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]])
-        await query.edit_message_text(stats_text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(stats_text, parse_mode='Markdown', reply_markup=_BACK_TO_MENU_KEYBOARD)
 
     elif data == 'settings':
-        keyboard = [
-            [InlineKeyboardButton("🗑️ Clear History", callback_data='clear_history')],
-            [InlineKeyboardButton("🤖 Switch Model", callback_data='switch_model')],
-            [InlineKeyboardButton("👤 Set Prompt", callback_data='system_prompt_info')],
-            [InlineKeyboardButton("🔍 Search History", callback_data='search_info')],
-            [InlineKeyboardButton("ℹ️ Model Info", callback_data='model_info')],
-            [InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]
-        ]
         await query.edit_message_text(
-             "⚙️ **Settings**\n\nChoose an option:",
-             reply_markup=InlineKeyboardMarkup(keyboard),
+             _SETTINGS_TEXT,
+             reply_markup=_SETTINGS_KEYBOARD,
              parse_mode='Markdown'
         )
 
     elif data == 'clear_history':
         if clear_user_history(user_id):
-            await query.edit_message_text("✅ **History cleared!**", parse_mode='Markdown', reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Settings", callback_data='settings')]]))
+            await query.edit_message_text("✅ **History cleared!**", parse_mode='Markdown', reply_markup=_BACK_TO_SETTINGS_KEYBOARD)
         else:
-            await query.edit_message_text("❌ **Error clearing history.**", parse_mode='Markdown', reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Settings", callback_data='settings')]]))
+            await query.edit_message_text("❌ **Error clearing history.**", parse_mode='Markdown', reply_markup=_BACK_TO_SETTINGS_KEYBOARD)
 
     elif data == 'switch_model':
         session = get_user_session(user_id)
-        current_model = DEFAULT_MODEL
-        if session: current_model = session.get('model_name', DEFAULT_MODEL)
+        current_model = _DM
+        if session: current_model = session.get('model_name', _DM)
         await query.edit_message_text(
             f"**Current Model:** `{current_model}`\n\n"
             "This bot uses **Llama 3.3 70B Versatile** model.\n"
             "Model switching is not available - using optimized single model.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Settings", callback_data='settings')]]),
+            reply_markup=_BACK_TO_SETTINGS_KEYBOARD,
             parse_mode='Markdown'
         )
 
@@ -3581,38 +4003,30 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif data == 'model_info':
         session = get_user_session(user_id)
         model_name = "N/A"
-        if session: model_name = session.get('model_name', DEFAULT_MODEL)
-        display_max_tokens = generation_config.get("max_tokens", "N/A")
-        display_temp = generation_config.get("temperature", "N/A")
+        if session: model_name = session.get('model_name', _DM)
 
-        model_text = f"🤖 **Model Config**\n\n**Your Model:** `{model_name}`\n**Temp:** {display_temp}\n**Max Tokens:** {display_max_tokens}"
-        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Settings", callback_data='settings')]])
-        await query.edit_message_text(model_text, parse_mode='Markdown', reply_markup=reply_markup)
+        model_text = f"🤖 **Model Config**\n\n**Your Model:** `{model_name}`\n**Temp:** {_DISPLAY_TEMP}\n**Max Tokens:** {_DISPLAY_MAX_TOKENS}"
+        await query.edit_message_text(model_text, parse_mode='Markdown', reply_markup=_BACK_TO_SETTINGS_KEYBOARD)
 
     elif data == 'system_prompt_info':
         await query.edit_message_text(
-            "Use the /system command in chat to view or change my personality.\n\n"
-            "**Example:** `/system You are a pirate`\n"
-            "**To reset:** `/system reset`",
+            _SYSTEM_PROMPT_INFO_TEXT,
             parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Settings", callback_data='settings')]])
+            reply_markup=_BACK_TO_SETTINGS_KEYBOARD
         )
     elif data == 'search_info':
         await query.edit_message_text(
-            "🔍 **Search Conversation History**\n\n"
-            "Use `/search your term` to search through your conversation history.\n\n"
-            "**Example:** `/search python code`\n\n"
-            "This will find all messages containing your search term.",
+            _SEARCH_INFO_TEXT,
             parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Settings", callback_data='settings')]])
+            reply_markup=_BACK_TO_SETTINGS_KEYBOARD
         )
     else:
-         logger.warning(f"Unhandled callback query data: {data}")
+         _logger.warning(f"Unhandled callback query data: {data}")
          # Avoid editing if possible, or provide a safe default
          try:
-            await query.edit_message_text("Unknown button pressed.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Menu", callback_data='menu')]]))
+            await query.edit_message_text("Unknown button pressed.", reply_markup=_BACK_TO_MENU_KEYBOARD)
          except Exception as edit_err:
-             logger.error(f"Failed to edit message for unhandled callback: {edit_err}")
+             _logger.error(f"Failed to edit message for unhandled callback: {edit_err}")
 
 
 # ============ ERROR HANDLER ============
@@ -3641,7 +4055,7 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
 
     if isinstance(update, Update) and update.effective_message:
         try:
-            await update.effective_message.reply_text(user_message, parse_mode='Markdown')
+            await _safe_reply(update.effective_message, user_message, parse_mode='Markdown')
         except Exception as e:
             logger.error(f"Failed to send error message: {e}")
     else:
@@ -3652,7 +4066,10 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
 
 # ============ EVENTS INTELLIGENCE AGENT (Merged) ============
 
-@dataclass
+# Strips all punctuation, Unicode included (’ – “ ...), so titles from different sources dedup alike
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+@dataclass(slots=True)
 class EventResult:
     """Standardized event data structure for cross-source deduplication."""
     title: str
@@ -3665,23 +4082,26 @@ class EventResult:
     category: Optional[str] = None
     is_online: bool = False
     relevance_score: float = 0.0
+    _norm_title: str = field(init=False, default="", repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Normalized once here; hashing/equality during dedup just read it
+        self._norm_title = self._normalize(self.title or "")
     
     def to_dict(self) -> dict:
-        return {
-            "title": self.title, "description": self.description, "date": self.date,
-            "time": self.time, "location": self.location, "url": self.url,
-            "source": self.source, "category": self.category,
-            "is_online": self.is_online, "relevance_score": self.relevance_score
-        }
+        return {name: getattr(self, name) for name in _EVENT_FIELDS}
     
-    def __hash__(self): return hash(self.title.lower().strip())
+    def __hash__(self): return hash(self._norm_title)
     
     def __eq__(self, other):
-        return isinstance(other, EventResult) and self._normalize(self.title) == self._normalize(other.title)
+        return isinstance(other, EventResult) and self._norm_title == other._norm_title
     
     @staticmethod
     def _normalize(text: str) -> str:
-        return re.sub(r'[^\w\s]', '', text.lower().strip())
+        return _PUNCT_RE.sub('', text.lower().strip())
+
+# Public fields for to_dict; _norm_title is the internal dedup key, not event data
+_EVENT_FIELDS = tuple(f.name for f in fields(EventResult) if f.name != '_norm_title')
 
 EVENTS_QUERY_PATTERNS = [
     r'\b(event|events|meetup|meetups|conference|conferences|workshop|workshops)\b',
@@ -3691,75 +4111,228 @@ EVENTS_QUERY_PATTERNS = [
     r'\b(tech\s+event|developer\s+meetup|coding\s+workshop|programming\s+conference)\b'
 ]
 
+# All patterns in one precompiled alternation: a single scan per query
+_EVENTS_RE = re.compile("|".join(f"(?:{p})" for p in EVENTS_QUERY_PATTERNS), re.IGNORECASE)
+
+def _build_events_hs_db():
+    """Compile EVENTS_QUERY_PATTERNS into one Hyperscan database, or None to use _EVENTS_RE."""
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.encode() for p in EVENTS_QUERY_PATTERNS],
+            ids=list(range(len(EVENTS_QUERY_PATTERNS))),
+            elements=len(EVENTS_QUERY_PATTERNS),
+            flags=hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH,
+        )
+        return db
+    except Exception as e:
+        logger.warning(f"Hyperscan events database unavailable ({e}), using re")
+        return None
+
+_EVENTS_HS_DB = _build_events_hs_db()
+
+# Literal roots of every word the patterns above can match - a cheap substring prefilter
+_EVENT_HINT_KEYWORDS = ('event', 'meetup', 'workshop', 'conference', 'seminar', 'webinar', 'summit', 'expo',
+                        'exhibition', 'fest', 'gathering', 'happening', 'occurring', 'scheduled', 'hosted', 'organized')
+
 def is_events_query(query: str) -> bool:
-    for pattern in EVENTS_QUERY_PATTERNS:
-        if re.search(pattern, query.lower(), re.IGNORECASE): return True
-    return False
+    q = query.lower()
+    if not any(k in q for k in _EVENT_HINT_KEYWORDS): return False
+    if _EVENTS_HS_DB is not None:
+        matched = []
+        _EVENTS_HS_DB.scan(q.encode('utf-8'), match_event_handler=lambda *_: matched.append(True))
+        return bool(matched)
+    return _EVENTS_RE.search(q) is not None
+
+KNOWN_EVENT_LOCATIONS = ['delhi', 'mumbai', 'bangalore', 'bengaluru', 'hyderabad', 'chennai', 'pune', 'noida', 'gurgaon']
+# Longest-first so a longer name always wins over any name that is its prefix
+_LOC_RE = re.compile(r'\b(' + '|'.join(map(re.escape, sorted(KNOWN_EVENT_LOCATIONS, key=len, reverse=True))) + r')\b', re.IGNORECASE)
+
+_TOPIC_MAP = {'python': 'Python', 'ai': 'AI/ML', 'react': 'React', 'startup': 'Startups'}
+_TOPIC_RE = re.compile(r'\b(' + '|'.join(map(re.escape, _TOPIC_MAP)) + r')\b', re.IGNORECASE)
 
 def extract_location_from_query(query: str) -> Optional[str]:
-    known = ['delhi', 'mumbai', 'bangalore', 'bengaluru', 'hyderabad', 'chennai', 'pune', 'noida', 'gurgaon']
-    for loc in known:
-        if loc in query.lower(): return loc.title()
-    return None
+    m = _LOC_RE.search(query)
+    return m.group(1).title() if m else None
 
 def extract_topic_from_query(query: str) -> Optional[str]:
-    keywords = {'python': 'Python', 'ai': 'AI/ML', 'react': 'React', 'startup': 'Startups'}
-    for k, v in keywords.items():
-        if k in query.lower(): return v
-    return None
+    m = _TOPIC_RE.search(query)
+    return _TOPIC_MAP[m.group(1).lower()] if m else None
+
+# Shared client for event sources: keeps connections warm across discover_events calls
+# (HTTP/2 when the optional 'h2' package is installed)
+_events_http_client: Optional[httpx.AsyncClient] = None
+
+def get_events_http_client() -> httpx.AsyncClient:
+    global _events_http_client
+    if _events_http_client is None or _events_http_client.is_closed:
+        _events_http_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=10.0,
+            follow_redirects=True,
+            headers={'User-Agent': 'Mozilla/5.0'},
+            limits=httpx.Limits(max_keepalive_connections=20),
+        )
+    return _events_http_client
+
+async def close_events_http_client():
+    global _events_http_client
+    if _events_http_client is not None:
+        await _events_http_client.aclose()
+        _events_http_client = None
+
+EVENTBRITE_MAX_BYTES = 256_000
+_EB_TITLE_RE = re.compile(r'<h2[^>]*class="[^"]*event-card__title[^"]*"[^>]*>([^<]+)</h2>', re.IGNORECASE)
 
 async def search_eventbrite(query: str, location: str = None, max_results: int = 5) -> List[EventResult]:
     events = []
     try:
         url = f"https://www.eventbrite.com/d/{quote_plus(location or 'online')}/{quote_plus(query)}/"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, headers={'User-Agent': 'Mozilla/5.0'}, follow_redirects=True)
-            if resp.status_code == 200:
-                titles = re.findall(r'<h2[^>]*class="[^"]*event-card__title[^"]*"[^>]*>([^<]+)</h2>', resp.text, re.IGNORECASE)[:max_results]
-                for t in titles: events.append(EventResult(title=t.strip(), description=f"Eventbrite: {t.strip()}", location=location, source="Eventbrite", relevance_score=0.8))
+        async with get_events_http_client().stream('GET', url) as resp:
+            if resp.status_code != 200: return events
+            # Read at most EVENTBRITE_MAX_BYTES - the first titles are near the top of the page
+            chunks, total = [], 0
+            async for chunk in resp.aiter_bytes():
+                chunks.append(chunk)
+                total += len(chunk)
+                if total >= EVENTBRITE_MAX_BYTES: break
+        text = b''.join(chunks)[:EVENTBRITE_MAX_BYTES].decode('utf-8', 'ignore')
+        # finditer + early break: stop scanning the page once we have enough titles
+        for i, m in enumerate(_EB_TITLE_RE.finditer(text)):
+            if i >= max_results: break
+            t = m.group(1).strip()
+            events.append(EventResult(title=t, description=f"Eventbrite: {t}", location=location, source="Eventbrite", relevance_score=0.8))
     except Exception: pass
     return events
 
+_MEETUP_URL = "https://www.meetup.com/gql"
+_MEETUP_GQL = "query categorySearch($query: String!, $first: Int) { keywordSearch(filter: { query: $query }, first: $first) { edges { node { result { ... on Event { title dateTime venue { city } eventUrl } } } } } }"
+_MEETUP_HEADERS = {'Content-Type': 'application/json'}
+
+def _extract_meetup_edges(data: dict) -> list:
+    """Walk only data.keywordSearch.edges of a Meetup GraphQL response."""
+    return ((data.get('data') or {}).get('keywordSearch') or {}).get('edges') or []
+
 async def search_meetup(query: str, location: str = None, max_results: int = 5) -> List[EventResult]:
     events = []
     try:
-        url = "https://www.meetup.com/gql"
-        qry = {"operationName": "categorySearch", "variables": {"first": max_results, "query": query, "lat": 28.6, "lon": 77.2}, "query": "query categorySearch($query: String!, $first: Int) { keywordSearch(filter: { query: $query }, first: $first) { edges { node { result { ... on Event { title description dateTime venue { city } eventUrl } } } } } }"}
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, json=qry, headers={'Content-Type': 'application/json'})
-            if resp.status_code == 200:
-                for edge in resp.json().get('data', {}).get('keywordSearch', {}).get('edges', []):
-                    node = edge.get('node', {}).get('result', {})
-                    if node: events.append(EventResult(title=node.get('title'), description=node.get('description', '')[:200], date=node.get('dateTime'), location=node.get('venue', {}).get('city'), url=node.get('eventUrl'), source="Meetup", relevance_score=0.9))
+        qry = {"operationName": "categorySearch", "variables": {"first": max_results, "query": query, "lat": 28.6, "lon": 77.2}, "query": _MEETUP_GQL}
+        resp = await get_events_http_client().post(_MEETUP_URL, json=qry, headers=_MEETUP_HEADERS)
+        if resp.status_code == 200:
+            for edge in _extract_meetup_edges(json_loads(resp.content)):
+                node = edge.get('node', {}).get('result', {})
+                if node: events.append(EventResult(title=node.get('title'), description=f"Meetup: {node.get('title')}", date=node.get('dateTime'), location=node.get('venue', {}).get('city'), url=node.get('eventUrl'), source="Meetup", relevance_score=0.9))
     except Exception: pass
     return events
 
+def _dedupe(events: List[EventResult]) -> List[EventResult]:
+    """Drop events with the same normalized title, keeping the first (source order wins)."""
+    seen = {}
+    for e in events:
+        seen.setdefault(e._norm_title, e)
+    return list(seen.values())
+
+EVENTS_CACHE_SIZE = 256
+EVENTS_CACHE_TTL = 1800  # Seconds - listings change on the order of hours
+EVENTS_SOURCE_TIMEOUT = 5.0  # Seconds per source, including any wait for a request slot
+# Backstop only: every source is already bounded by EVENTS_SOURCE_TIMEOUT, so this fires only
+# if a source overruns its cancellation (e.g. swallows CancelledError). Keep it above the timeout.
+EVENTS_SEARCH_DEADLINE = 7.0
+EVENTS_MAX_CONCURRENT_SOURCES = 4  # Source requests in flight across all concurrent searches
+
 class EventsIntelligenceAgent:
     def __init__(self):
         self.sources = [("Eventbrite", search_eventbrite), ("Meetup", search_meetup)]
+        # TTL + LRU result cache: key -> (stored_at, events)
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Task] = {}  # Concurrent identical searches share one fan-out
+        self._sem = asyncio.Semaphore(EVENTS_MAX_CONCURRENT_SOURCES)  # Shared by every search on this agent
+    
+    @staticmethod
+    async def _guarded(sem: asyncio.Semaphore, func, query: str, location: Optional[str]) -> List[EventResult]:
+        async with sem:
+            return await func(query, location, 5)
+    
+    async def _run_source(self, func, query: str, location: Optional[str]) -> List[EventResult]:
+        # The timeout covers the wait for a slot too; TimeoutError propagates so the search counts as incomplete
+        return await asyncio.wait_for(self._guarded(self._sem, func, query, location), EVENTS_SOURCE_TIMEOUT)
+    
+    def _cache_get(self, key: tuple) -> Optional[List[EventResult]]:
+        entry = self._cache.get(key)
+        if entry is None: return None
+        if time.monotonic() - entry[0] > EVENTS_CACHE_TTL:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+    
+    def _cache_put(self, key: tuple, events: List[EventResult]):
+        self._cache[key] = (time.monotonic(), events)
+        self._cache.move_to_end(key)
+        if len(self._cache) > EVENTS_CACHE_SIZE:
+            self._cache.popitem(last=False)
     
     async def discover_events(self, query: str, location: str = None) -> List[EventResult]:
         if not location: location = extract_location_from_query(query)
-        tasks = [func(query, location, 5) for _, func in self.sources]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        key = (query.lower().strip(), (location or '').lower())
+        cached = self._cache_get(key)
+        if cached is not None: return cached
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._search(key, query, location))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller going away doesn't cancel the search the others are waiting on
+        return await asyncio.shield(task)
+    
+    async def _search(self, key: tuple, query: str, location: Optional[str]) -> List[EventResult]:
+        tasks = [asyncio.create_task(self._run_source(func, query, location)) for _, func in self.sources]
+        # Backstop deadline (see EVENTS_SEARCH_DEADLINE); per-source timeouts normally end the wait first
+        done, pending = await asyncio.wait(tasks, timeout=EVENTS_SEARCH_DEADLINE)
+        for t in pending: t.cancel()
+        if pending: logger.info(f"Events search: {len(pending)} source(s) missed the {EVENTS_SEARCH_DEADLINE}s deadline")
         all_events = []
-        for res in results:
-            if isinstance(res, list): all_events.extend(res)
+        complete = not pending
+        for (name, _), t in zip(self.sources, tasks):  # Source order, so dedup keeps the preferred source
+            if t in done and not t.cancelled() and t.exception() is None: all_events.extend(t.result())
+            else:
+                complete = False
+                if t in done and isinstance(t.exception(), asyncio.TimeoutError):
+                    logger.info(f"Events search: {name} timed out after {EVENTS_SOURCE_TIMEOUT}s")
+        all_events = _dedupe(all_events)
+        # Cache only full, non-empty answers: a timeout or failing source (they return [])
+        # must not pin an empty/partial result for the whole TTL
+        if complete and all_events: self._cache_put(key, all_events)
         return all_events
     
     def format_events_for_display(self, events):
         if not events: return "No events found."
-        out = f"**Found {len(events)} Events:**\n"
-        for i, e in enumerate(events, 1): out += f"{i}. {e.title} ({e.source})\n"
-        return out
+        lines = [f"**Found {len(events)} Events:**"]
+        lines.extend(f"{i}. {e.title} ({e.source})" for i, e in enumerate(events, 1))
+        return "\n".join(lines) + "\n"
+
+_events_agent: Optional[EventsIntelligenceAgent] = None
+
+def get_events_agent() -> EventsIntelligenceAgent:
+    """Return the shared EventsIntelligenceAgent, creating it on first use."""
+    global _events_agent
+    if _events_agent is None:
+        _events_agent = EventsIntelligenceAgent()
+    return _events_agent
+
+async def on_shutdown(application: Application):
+    """Application post_shutdown hook: flush user data and close pooled connections."""
+    await stop_user_data_flusher(application)
+    await close_events_http_client()
 
 def main():
     """Start the bot."""
     logger.info("Starting Cerebras/Llama Telegram Bot...")
 
-    if "8145214223:" in TELEGRAM_BOT_TOKEN or CEREBRAS_API_KEY.startswith("csk-"):
-        logger.warning("API tokens appear hardcoded. Consider using environment variables for security.")
-
+    # Pre-flight: required keys first, then the hardcoded-token check on values known to be set
     if not TELEGRAM_BOT_TOKEN or TELEGRAM_BOT_TOKEN == "YOUR_TELEGRAM_BOT_TOKEN_HERE":
         logger.critical("TELEGRAM_BOT_TOKEN is not set!")
         return
@@ -3768,6 +4341,12 @@ def main():
         logger.critical("CEREBRAS_API_KEY is not set!")
         return
 
+    if TELEGRAM_BOT_TOKEN.startswith("8145214223:") or CEREBRAS_API_KEY.startswith("csk-"):
+        logger.warning("API tokens appear hardcoded. Consider using environment variables for security.")
+
+    if GPT_RESEARCHER_ENABLED and not GPT_RESEARCHER_AVAILABLE:
+        logger.warning("GPT Researcher enabled but not installed. Run: pip install gpt-researcher")
+
     global user_sessions
     user_sessions = load_user_data()
     logger.info(f"Loaded data for {len(user_sessions)} users from {USER_DATA_FILE}.")
@@ -3775,6 +4354,8 @@ def main():
     application = (
         Application.builder()
         .token(TELEGRAM_BOT_TOKEN)
+        .post_init(start_user_data_flusher)
+        .post_shutdown(on_shutdown)
         .build()
     )
 